@@ -1,18 +1,66 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import contextlib
 import os
 import sys
-import json
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlparse
 import logging
+import orjson
 from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
 
-from ocr_extractor import OCRExtractor
+from ocr_extractor import OCRExtractor, STRUCTURED_PROMPT, DEFAULT_CACHE_DIR, is_url
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif'})
+
+# Write buffer for aggregated .jsonl batch output
+JSONL_BUFFER_SIZE = 1 << 20
+
+def positive_int(value: str) -> int:
+    """
+    argparse type for options that must be at least 1.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def find_existing_files(paths: List[str]) -> Set[str]:
+    """
+    Find which paths are existing files, listing each directory once instead of a stat per path.
+    
+    Args:
+        paths: Paths to check
+        
+    Returns:
+        The subset of paths that are files
+    """
+    paths_by_dir: Dict[str, List[str]] = {}
+    for path in paths:
+        paths_by_dir.setdefault(os.path.dirname(path), []).append(path)
+    
+    existing = set()
+    for directory, dir_paths in paths_by_dir.items():
+        try:
+            # is_file() answers from the directory entry except for symlinks, which it follows
+            with os.scandir(directory or ".") as entries:
+                names = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            names = set()
+        
+        for path in dir_paths:
+            # Fall back to a stat for misses, e.g. differently-cased names on case-insensitive filesystems
+            if os.path.basename(path) in names or os.path.isfile(path):
+                existing.add(path)
+    
+    return existing
+
 def process_single_image(extractor: OCRExtractor, image_path: str, prompt: Optional[str] = None, 
                          output_file: Optional[str] = None, structured: bool = False) -> None:
     """
@@ -20,7 +68,7 @@ def process_single_image(extractor: OCRExtractor, image_path: str, prompt: Optio
     
     Args:
         extractor: OCRExtractor instance
-        image_path: Path to the image file
+        image_path: Path to the image file or http(s) URL
         prompt: Custom prompt to use
         output_file: Path to save the output
         structured: Whether to extract structured data
@@ -28,18 +76,26 @@ def process_single_image(extractor: OCRExtractor, image_path: str, prompt: Optio
     try:
         if structured:
             result = extractor.extract_structured_data(image_path)
-            extracted_text = json.dumps(result, indent=2)
+            chunks = iter([orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()])
         else:
-            extracted_text = extractor.extract_text_from_image(image_path, prompt or "Extract all text from this image.")
+            chunks = iter(extractor.stream_text_from_image(image_path, prompt or "Extract all text from this image."))
+        
+        # Wait for the first chunk so a failed request doesn't truncate the output file
+        first_chunk = next(chunks, "")
         
         if output_file:
             with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(extracted_text)
+                f.write(first_chunk)
+                for chunk in chunks:
+                    f.write(chunk)
             print(f"Results saved to {output_file}")
         else:
             print("\nExtracted Text:")
             print("-" * 50)
-            print(extracted_text)
+            print(first_chunk, end="", flush=True)
+            for chunk in chunks:
+                print(chunk, end="", flush=True)
+            print()
             print("-" * 50)
             
     except Exception as e:
@@ -47,62 +103,123 @@ def process_single_image(extractor: OCRExtractor, image_path: str, prompt: Optio
         print(f"Error: {e}")
 
 def process_batch(extractor: OCRExtractor, image_paths: List[str], prompt: Optional[str] = None,
-                 output_dir: Optional[str] = None, structured: bool = False) -> None:
+                 output_dir: Optional[str] = None, structured: bool = False, concurrency: int = 8) -> None:
     """
     Process multiple images in batch.
     
     Args:
         extractor: OCRExtractor instance
-        image_paths: List of paths to image files
+        image_paths: List of paths to image files or http(s) URLs
         prompt: Custom prompt to use for all images
-        output_dir: Directory to save the outputs
+        output_dir: Directory to save the outputs, or a .jsonl file to collect them all in
         structured: Whether to extract structured data
+        concurrency: Maximum number of API requests in flight at once
     """
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    output_jsonl = None
+    if output_dir and output_dir.endswith(".jsonl"):
+        output_jsonl, output_dir = output_dir, None
+    elif output_dir:
+        os.makedirs(output_dir, exist_ok=True)
     
-    for image_path in tqdm(image_paths, desc="Processing images"):
-        try:
-            if structured:
-                result = extractor.extract_structured_data(image_path)
-                extracted_text = json.dumps(result, indent=2)
-            else:
-                extracted_text = extractor.extract_text_from_image(image_path, prompt or "Extract all text from this image.")
+    if structured:
+        prompt = STRUCTURED_PROMPT.format(data_format="table")
+    
+    asyncio.run(_process_batch_async(extractor, image_paths, prompt, output_dir, output_jsonl,
+                                     structured, concurrency))
+
+async def _process_batch_async(extractor: OCRExtractor, image_paths: List[str], prompt: Optional[str],
+                               output_dir: Optional[str], output_jsonl: Optional[str], structured: bool,
+                               concurrency: int) -> None:
+    """
+    Run the batch concurrently, handling each result as soon as it completes.
+    
+    Results printed to stdout, and log records, go through tqdm.write so they don't fight
+    the progress bar for the terminal. When saving to files, nothing is printed per image
+    and a single summary line is emitted at the end.
+    """
+    saving = bool(output_dir or output_jsonl)
+    failed = 0
+    
+    with contextlib.ExitStack() as stack:
+        progress = stack.enter_context(
+            tqdm(total=len(image_paths), desc="Processing images", mininterval=0.2, smoothing=0.1)
+        )
+        stack.enter_context(logging_redirect_tqdm())
+        # One buffered handle for the whole batch rather than a file per image
+        jsonl_file = stack.enter_context(open(output_jsonl, 'wb', buffering=JSONL_BUFFER_SIZE)) if output_jsonl else None
+        
+        async for image_path, result in extractor.iter_batch_async(image_paths, prompt, concurrency):
+            progress.update(1)
             
-            if output_dir:
-                base_name = os.path.basename(image_path)
-                file_name = os.path.splitext(base_name)[0] + ".txt"
-                output_file = os.path.join(output_dir, file_name)
+            if isinstance(result, Exception):
+                failed += 1
+                if jsonl_file:
+                    jsonl_file.write(orjson.dumps({"path": image_path, "error": str(result)}) + b"\n")
+                if not saving:
+                    tqdm.write(f"Error processing {image_path}: {result}")
+                continue
+            
+            try:
+                if jsonl_file:
+                    jsonl_file.write(orjson.dumps({"path": image_path, "text": result}) + b"\n")
+                    continue
                 
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(extracted_text)
-                logger.info(f"Saved results for {image_path} to {output_file}")
-            else:
-                print(f"\nResults for {image_path}:")
-                print("-" * 50)
-                print(extracted_text)
-                print("-" * 50)
+                if structured:
+                    extracted_text = orjson.dumps({"result": result}, option=orjson.OPT_INDENT_2).decode()
+                else:
+                    extracted_text = result
                 
-        except Exception as e:
-            logger.error(f"Error processing image {image_path}: {e}")
-            print(f"Error processing {image_path}: {e}")
+                if output_dir:
+                    # Ignore any query string when naming outputs for URLs
+                    base_name = os.path.basename(urlparse(image_path).path if is_url(image_path) else image_path)
+                    file_name = os.path.splitext(base_name)[0] + ".txt"
+                    output_file = os.path.join(output_dir, file_name)
+                    
+                    with open(output_file, 'w', encoding='utf-8') as f:
+                        f.write(extracted_text)
+                else:
+                    separator = "-" * 50
+                    tqdm.write(f"\nResults for {image_path}:\n{separator}\n{extracted_text}\n{separator}")
+                    
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error processing image {image_path}: {e}")
+                if not saving:
+                    tqdm.write(f"Error processing {image_path}: {e}")
+    
+    if saving:
+        print(f"Processed {len(image_paths)} images ({failed} failed); results saved to {output_jsonl or output_dir}")
 
 def main():
     parser = argparse.ArgumentParser(description="Extract text from images using GPT-4o Vision")
     
     # Input options
     input_group = parser.add_mutually_exclusive_group(required=True)
-    input_group.add_argument("--image", help="Path to a single image file")
+    input_group.add_argument("--image", help="Path or http(s) URL of a single image")
     input_group.add_argument("--dir", help="Path to a directory containing images")
-    input_group.add_argument("--list", help="Path to a text file with image paths (one per line)")
+    input_group.add_argument("--list", help="Path to a text file with image paths or URLs (one per line)")
     
     # Processing options
     parser.add_argument("--prompt", help="Custom prompt for the model")
     parser.add_argument("--structured", action="store_true", help="Extract structured data (like tables)")
     parser.add_argument("--model", default="gpt-4o", help="OpenAI model to use (default: gpt-4o)")
+    parser.add_argument("--max-tokens", type=int, default=4096,
+                        help="Maximum number of tokens the model may generate per image (default: 4096)")
+    parser.add_argument("--max-side", type=int, default=2048,
+                        help="Downscale images so the longest edge fits this many pixels; 0 sends originals (default: 2048)")
+    parser.add_argument("--concurrency", type=positive_int, default=8,
+                        help="Maximum number of API requests in flight during batch processing (default: 8)")
+    parser.add_argument("--processes", type=positive_int,
+                        help="Preprocess batch images in this many worker processes (default: threads only)")
+    parser.add_argument("--rps", type=float, help="Maximum API requests per second (default: unlimited)")
+    parser.add_argument("--max-attempts", type=int, default=5,
+                        help="Attempts per request on rate-limit and server errors (default: 5)")
+    
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and don't store cached results")
     
     # Output options
-    parser.add_argument("--output", help="Output file for single image or directory for batch processing")
+    parser.add_argument("--output",
+                        help="Output file for single image, or directory (or .jsonl file) for batch processing")
     parser.add_argument("--format", choices=["txt", "json"], default="txt", help="Output format (default: txt)")
     
     # API options
@@ -112,14 +229,23 @@ def main():
     
     # Initialize the extractor
     try:
-        extractor = OCRExtractor(api_key=args.api_key, model=args.model)
+        extractor = OCRExtractor(
+            api_key=args.api_key,
+            model=args.model,
+            requests_per_second=args.rps,
+            max_attempts=args.max_attempts,
+            max_side=args.max_side or None,
+            cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR,
+            max_tokens=args.max_tokens,
+            processes=args.processes
+        )
     except ValueError as e:
         print(f"Error: {e}")
         return
     
     # Process single image
     if args.image:
-        if not os.path.isfile(args.image):
+        if not is_url(args.image) and not os.path.isfile(args.image):
             print(f"Error: Image file not found: {args.image}")
             return
             
@@ -137,12 +263,13 @@ def main():
             print(f"Error: Directory not found: {args.dir}")
             return
             
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif']
-        image_paths = []
-        
-        for file in os.listdir(args.dir):
-            if any(file.lower().endswith(ext) for ext in image_extensions):
-                image_paths.append(os.path.join(args.dir, file))
+        # scandir gets the entry type from the directory listing itself, so no stat per file
+        with os.scandir(args.dir) as entries:
+            image_paths = [
+                entry.path for entry in entries
+                if entry.is_file(follow_symlinks=False)
+                and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+            ]
         
         if not image_paths:
             print(f"No image files found in directory: {args.dir}")
@@ -154,7 +281,8 @@ def main():
             image_paths=image_paths,
             prompt=args.prompt,
             output_dir=args.output,
-            structured=args.structured
+            structured=args.structured,
+            concurrency=args.concurrency
         )
     
     # Process list of image paths
@@ -167,9 +295,10 @@ def main():
             image_paths = [line.strip() for line in f if line.strip()]
         
         # Validate paths
+        existing_files = find_existing_files([path for path in image_paths if not is_url(path)])
         valid_paths = []
         for path in image_paths:
-            if os.path.isfile(path):
+            if is_url(path) or path in existing_files:
                 valid_paths.append(path)
             else:
                 print(f"Warning: File not found, skipping: {path}")
@@ -184,7 +313,8 @@ def main():
             image_paths=valid_paths,
             prompt=args.prompt,
             output_dir=args.output,
-            structured=args.structured
+            structured=args.structured,
+            concurrency=args.concurrency
         )
 
 if __name__ == "__main__":
@@ -1,8 +1,19 @@
 import os
 import base64
-from typing import Optional, Dict, Any, List, Union
+import asyncio
+import hashlib
+import multiprocessing
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Union, AsyncIterator, Iterator, Tuple, Callable, NamedTuple
+import orjson
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import aiohttp
+from PIL import Image, ImageOps
 import io
 import logging
 
@@ -10,18 +21,185 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Prompt used for structured extraction; formatted with the requested data format
+STRUCTURED_PROMPT = "Extract the {data_format} data from this image and format it as JSON."
+
+# Exponential backoff settings (seconds) for throttled or failed requests
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+BACKOFF_JITTER = 1.0
+
+# (connect, read) timeouts in seconds for API requests
+REQUEST_TIMEOUT = (5, 120)
+
+# Size of the pooled HTTPS connection cache for synchronous requests
+POOL_SIZE = 32
+
+# JPEG quality used when re-encoding downscaled images
+JPEG_QUALITY = 85
+
+# Default on-disk location for cached extraction results
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "ocr_extractor")
+
+# Stand-ins for the per-call fields when pre-serializing the request body template
+_PROMPT_PLACEHOLDER = "__ocr_extractor_prompt__"
+_IMAGE_URL_PLACEHOLDER = "__ocr_extractor_image_url__"
+
+def is_url(image_source: str) -> bool:
+    """
+    Check whether an image source is a remote URL rather than a local path.
+    
+    Args:
+        image_source: Image path or URL.
+        
+    Returns:
+        True if the source is an http(s) URL.
+    """
+    return image_source.startswith(("http://", "https://"))
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    """
+    Convert an image to RGB for JPEG encoding, flattening any transparency onto white.
+    
+    A plain convert("RGB") drops the alpha band, which turns transparent backgrounds
+    black and makes dark text on them unreadable.
+    
+    Args:
+        img: The image to convert.
+        
+    Returns:
+        The image itself if it is already RGB, otherwise an RGB copy.
+    """
+    if img.mode in ("RGBA", "LA", "PA", "RGBa", "La") or "transparency" in img.info:
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    
+    # Most inputs are already RGB; only convert (a full buffer copy) when needed
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+def _load_image(image_path: str, max_side: Optional[int]) -> Tuple[bytes, str]:
+    """
+    Read an image file, preprocessing it for upload.
+    
+    Unless max_side is None, the image is first downscaled to fit within max_side
+    and re-encoded as JPEG, which is far smaller than most source files. Otherwise
+    the original bytes are sent with the MIME type of their detected format.
+    
+    Args:
+        image_path: Path to the image file.
+        max_side: Longest edge in pixels to downscale to, or None to send the original file.
+        
+    Returns:
+        Tuple of (image bytes to send to the API, their MIME type).
+    """
+    try:
+        if max_side is None:
+            with open(image_path, "rb") as image_file:
+                image_bytes = image_file.read()
+            # Only the header is parsed to identify the format
+            with Image.open(io.BytesIO(image_bytes)) as img:
+                mime_type = Image.MIME.get(img.format, "application/octet-stream")
+            return image_bytes, mime_type
+        
+        with Image.open(image_path) as img:
+            # thumbnail and exif_transpose both work in place. Rotating after the resize
+            # touches far fewer pixels, and the square bound means the fit is the same
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            ImageOps.exif_transpose(img, in_place=True)
+            rgb = _to_rgb(img)
+            buf = io.BytesIO()
+            # optimize=True costs a second entropy-coding pass for a few percent smaller output
+            rgb.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=False, progressive=False)
+        return buf.getvalue(), "image/jpeg"
+    except Exception as e:
+        logger.error(f"Error encoding image: {e}")
+        raise
+
+def _compute_cache_key(image_bytes: bytes, prompt: str, model: str, max_tokens: int) -> str:
+    """
+    Compute the content-addressed cache key for an image request.
+    
+    The token limit is part of the key so a result truncated under a lower limit
+    isn't served once the limit is raised.
+    
+    Args:
+        image_bytes: Preprocessed image bytes.
+        prompt: The prompt sent to the model.
+        model: The model the request is sent to.
+        max_tokens: The token limit of the request.
+        
+    Returns:
+        Hex digest identifying the request.
+    """
+    # Feed the parts incrementally rather than concatenating, which would copy the whole image
+    digest = hashlib.sha256(image_bytes)
+    for part in (prompt, model, str(max_tokens)):
+        digest.update(b"\0")
+        digest.update(part.encode())
+    return digest.hexdigest()
+
+def _preprocess_image(image_path: str, max_side: Optional[int], prompt: str,
+                      model: str, max_tokens: int) -> Tuple[bytes, str, str]:
+    """
+    Load an image for upload and compute its cache key.
+    
+    This is the CPU-bound part of preparing a request. It is a module-level function
+    taking plain arguments so it can run in a worker process.
+    
+    Returns:
+        Tuple of (image bytes, MIME type, cache key).
+    """
+    image_bytes, mime_type = _load_image(image_path, max_side)
+    return image_bytes, mime_type, _compute_cache_key(image_bytes, prompt, model, max_tokens)
+
+class _LoadedImage(NamedTuple):
+    """
+    A preprocessed local image and any cached result for it, before encoding or upload.
+    """
+    image_bytes: bytes
+    mime_type: str
+    cache_key: str
+    cached_text: Optional[str]
+
+class _PreparedImage(NamedTuple):
+    """
+    Result of preprocessing one image: either a cache hit or the URL to send.
+    """
+    cache_key: Optional[str]
+    cached_text: Optional[str]
+    image_url: Optional[Union[str, bytes]]
+
 class OCRExtractor:
     """
     A class for extracting text from images using OpenAI's GPT-4o Vision model.
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o",
+                 requests_per_second: Optional[float] = None, max_attempts: int = 5,
+                 max_side: Optional[int] = 2048,
+                 upload_backend: Optional[Callable[[bytes, str], str]] = None,
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR, max_tokens: int = 4096,
+                 processes: Optional[int] = None):
         """
         Initialize the OCR extractor.
         
         Args:
             api_key: OpenAI API key. If not provided, will look for OPENAI_API_KEY environment variable.
             model: The OpenAI model to use. Default is "gpt-4o".
+            requests_per_second: Maximum request rate to the API. Default is None (unlimited).
+            max_attempts: Attempts per request before giving up on 429 and 5xx responses. Default is 5.
+            max_side: Longest image edge in pixels sent to the API; larger images are downscaled
+                and re-encoded as JPEG. None sends the original file untouched. Default is 2048.
+            upload_backend: Optional callable taking image bytes and their MIME type and returning a URL the
+                API can fetch (e.g. after a presigned S3 PUT). When set, local images are uploaded instead of
+                being inlined as base64 data URLs.
+            cache_dir: Directory for cached results, keyed by the preprocessed image, prompt and model.
+                None disables caching. Default is ~/.cache/ocr_extractor.
+            max_tokens: Maximum number of tokens the model may generate per image. Default is 4096.
+            processes: Number of worker processes for preprocessing batch images. None preprocesses
+                on threads in this process only. Default is None.
         """
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         if not self.api_key:
@@ -34,31 +212,238 @@ class OCRExtractor:
             "Content-Type": "application/json"
         }
         
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        
+        self.requests_per_second = requests_per_second
+        self.max_attempts = max_attempts
+        self.max_side = max_side
+        self.upload_backend = upload_backend
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.max_tokens = max_tokens
+        self._next_allowed_ts = 0.0
+        # Created per event loop by iter_batch_async
+        self._rate_lock: Optional[asyncio.Lock] = None
+        
+        # Reuse connections across requests instead of a new TCP+TLS handshake per image.
+        # Retries are handled by _post_with_retry, so the adapter itself never retries.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=Retry(total=0))
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.headers)
+        
+        # Decoding, resizing and encoding images is CPU work; batches run it here so it
+        # overlaps with API requests instead of blocking the event loop
+        self._prep_workers = os.cpu_count() or 1
+        self._prep_pool = ThreadPoolExecutor(max_workers=self._prep_workers, thread_name_prefix="ocr-prep")
+        
+        # Decoding and resizing also hold the GIL for part of the work, so on many-core hosts
+        # batches can move it into separate processes. forkserver avoids forking a process
+        # that already has threads and open connections.
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        if processes:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._process_pool = ProcessPoolExecutor(max_workers=processes,
+                                                     mp_context=multiprocessing.get_context(start_method))
+            self._prep_workers = processes
+        
+        # Request bodies serialized once per (model, max_tokens, stream), split around the
+        # prompt and image URL so _build_payload only has to splice those in
+        self._body_templates: Dict[Tuple[str, int, bool], Tuple[bytes, bytes, bytes]] = {}
+        
         logger.info(f"OCRExtractor initialized with model: {model}")
     
-    def _encode_image(self, image_path: str) -> str:
+    def __enter__(self) -> "OCRExtractor":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """
+        Close the pooled HTTP connections and preprocessing workers.
+        """
+        self.session.close()
+        self._prep_pool.shutdown(wait=False)
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False)
+    
+    def _load_image_bytes(self, image_path: str) -> Tuple[bytes, str]:
         """
-        Encode an image file to base64.
+        Read an image file, preprocessing it for upload according to max_side.
         
         Args:
             image_path: Path to the image file.
             
         Returns:
-            Base64 encoded image string.
+            Tuple of (image bytes to send to the API, their MIME type).
         """
+        return _load_image(image_path, self.max_side)
+    
+    def _image_url_from_bytes(self, image_bytes: bytes, mime_type: str) -> Union[str, bytes]:
+        """
+        Turn preprocessed image bytes into the URL sent to the API.
+        
+        The image is uploaded with upload_backend if one is configured,
+        otherwise inlined as a base64 data URL.
+        
+        Args:
+            image_bytes: Preprocessed image bytes.
+            mime_type: MIME type of image_bytes.
+            
+        Returns:
+            URL for the image_url content part. Data URLs are returned already serialized as a
+            JSON string (bytes), so the base64 output is never decoded into an intermediate str.
+        """
+        if self.upload_backend:
+            return self.upload_backend(image_bytes, mime_type)
+        
+        # Base64 output never needs JSON escaping, so the quoted bytes are already valid JSON
+        # and _build_payload splices them straight into the request body
+        prefix = f'"data:{mime_type};base64,'.encode('ascii')
+        return b"".join((prefix, base64.b64encode(image_bytes), b'"'))
+    
+    def _cache_key(self, image_bytes: bytes, prompt: str) -> str:
+        """
+        Compute the content-addressed cache key for an image request to this extractor's model.
+        
+        Args:
+            image_bytes: Preprocessed image bytes.
+            prompt: The prompt sent to the model.
+            
+        Returns:
+            Hex digest identifying the request.
+        """
+        return _compute_cache_key(image_bytes, prompt, self.model, self.max_tokens)
+    
+    def _cache_path(self, cache_key: str) -> str:
+        """
+        Get the cache file for a key, fanned out into subdirectories by prefix.
+        """
+        return os.path.join(self.cache_dir, cache_key[:2], cache_key)
+    
+    def _cache_get(self, cache_key: str) -> Optional[str]:
+        """
+        Look up a cached extraction result.
+        
+        Args:
+            cache_key: Key from _cache_key.
+            
+        Returns:
+            The cached text, or None on a miss or when caching is disabled.
+        """
+        if not self.cache_dir:
+            return None
+        
         try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        except Exception as e:
-            logger.error(f"Error encoding image: {e}")
-            raise
+            with open(self._cache_path(cache_key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Error reading result cache: {e}")
+            return None
+    
+    def _cache_set(self, cache_key: str, text: str) -> None:
+        """
+        Store an extraction result in the cache. Failures are logged, not raised.
+        
+        Args:
+            cache_key: Key from _cache_key.
+            text: The extracted text.
+        """
+        if not self.cache_dir:
+            return
+        
+        path = self._cache_path(cache_key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a unique temporary file first so concurrent readers never see a
+            # partial entry and concurrent writers never share a file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Error writing result cache: {e}")
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+    
+    def _prepare_image(self, image_source: str, prompt: str) -> _PreparedImage:
+        """
+        Preprocess an image and check the cache for an earlier result.
+        
+        Args:
+            image_source: Path to the image file, or an http(s) URL.
+            prompt: The prompt to send to the model.
+            
+        Returns:
+            The cached text on a hit, otherwise the URL to send and the key to cache the result under.
+        """
+        if is_url(image_source):
+            return _PreparedImage(None, None, image_source)
+        
+        return self._prepare_loaded_image(self._load_image_checked(image_source, prompt))
+    
+    def _load_image_checked(self, image_path: str, prompt: str) -> _LoadedImage:
+        """
+        Preprocess a local image and check the cache for an earlier result, without encoding it.
+        
+        Args:
+            image_path: Path to the image file.
+            prompt: The prompt to send to the model.
+            
+        Returns:
+            The preprocessed image, its cache key and any cached text.
+        """
+        image_bytes, mime_type = self._load_image_bytes(image_path)
+        return self._check_loaded_image(image_path, image_bytes, mime_type, self._cache_key(image_bytes, prompt))
+    
+    def _check_loaded_image(self, image_source: str, image_bytes: bytes, mime_type: str,
+                            cache_key: str) -> _LoadedImage:
+        """
+        Check the cache for an already preprocessed image.
+        
+        Args:
+            image_source: Path to the image file, used for logging.
+            image_bytes: Preprocessed image bytes.
+            mime_type: MIME type of image_bytes.
+            cache_key: Key from _cache_key.
+            
+        Returns:
+            The preprocessed image, its cache key and any cached text.
+        """
+        cached_text = self._cache_get(cache_key)
+        if cached_text is not None:
+            logger.info(f"Using cached result for image: {image_source}")
+        return _LoadedImage(image_bytes, mime_type, cache_key, cached_text)
+    
+    def _prepare_loaded_image(self, loaded: _LoadedImage) -> _PreparedImage:
+        """
+        Encode or upload a preprocessed image, unless its result is already cached.
+        
+        Args:
+            loaded: Result of _load_image_checked or _check_loaded_image.
+            
+        Returns:
+            The cached text on a hit, otherwise the URL to send and the key to cache the result under.
+        """
+        if loaded.cached_text is not None:
+            return _PreparedImage(loaded.cache_key, loaded.cached_text, None)
+        
+        # Encode or upload the image
+        return _PreparedImage(loaded.cache_key, None, self._image_url_from_bytes(loaded.image_bytes, loaded.mime_type))
     
-    def _prepare_image_payload(self, image_data: str) -> Dict[str, Any]:
+    def _prepare_image_payload(self, image_url: str) -> Dict[str, Any]:
         """
         Prepare the image payload for the API request.
         
         Args:
-            image_data: Base64 encoded image data.
+            image_url: Remote or base64 data URL of the image.
             
         Returns:
             Dictionary containing the image payload.
@@ -66,50 +451,191 @@ class OCRExtractor:
         return {
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/jpeg;base64,{image_data}",
+                "url": image_url,
                 "detail": "high"
             }
         }
     
+    def _serialize_body_template(self, stream: bool) -> Tuple[bytes, bytes, bytes]:
+        """
+        Serialize the fixed parts of the chat completion request body.
+        
+        Args:
+            stream: Whether the body asks for the response as server-sent events.
+            
+        Returns:
+            The JSON before the prompt, between the prompt and the image URL, and after the image URL.
+        """
+        template = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": _PROMPT_PLACEHOLDER},
+                        self._prepare_image_payload(_IMAGE_URL_PLACEHOLDER)
+                    ]
+                }
+            ],
+            "max_tokens": self.max_tokens
+        }
+        if stream:
+            template["stream"] = True
+        
+        body = orjson.dumps(template)
+        head, rest = body.split(orjson.dumps(_PROMPT_PLACEHOLDER))
+        middle, tail = rest.split(orjson.dumps(_IMAGE_URL_PLACEHOLDER))
+        return head, middle, tail
+    
+    def _build_payload(self, prompt: str, image_url: Union[str, bytes], stream: bool = False) -> bytes:
+        """
+        Build the serialized chat completion request body for an image.
+        
+        Args:
+            prompt: The prompt to send to the model.
+            image_url: Remote URL of the image, or a data URL already serialized as a JSON string.
+            stream: Whether to ask for the response as server-sent events. Default is False.
+            
+        Returns:
+            The JSON request body.
+        """
+        # model and max_tokens are public, so the template is looked up by their current values
+        template_key = (self.model, self.max_tokens, stream)
+        template = self._body_templates.get(template_key)
+        if template is None:
+            template = self._body_templates[template_key] = self._serialize_body_template(stream)
+        head, middle, tail = template
+        image_url_json = image_url if isinstance(image_url, bytes) else orjson.dumps(image_url)
+        return b"".join((head, orjson.dumps(prompt), middle, image_url_json, tail))
+    
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """
+        Work out how long to wait before retrying a request.
+        
+        Args:
+            attempt: Zero-based index of the attempt that failed.
+            retry_after: Value of the Retry-After response header, if any.
+            
+        Returns:
+            Delay in seconds.
+        """
+        if retry_after:
+            try:
+                # Capped like our own backoff so a huge or hostile header can't stall a worker
+                return min(BACKOFF_CAP, max(0.0, float(retry_after)))
+            except ValueError:
+                # HTTP-date form; fall back to our own backoff
+                pass
+        return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) + random.uniform(0, BACKOFF_JITTER)
+    
+    def _wait_for_rate_limit(self) -> None:
+        """
+        Block until the next request is allowed under requests_per_second.
+        """
+        if not self.requests_per_second:
+            return
+        
+        delay = max(0.0, self._next_allowed_ts - time.monotonic())
+        if delay:
+            time.sleep(delay)
+        self._next_allowed_ts = time.monotonic() + 1.0 / self.requests_per_second
+    
+    async def _wait_for_rate_limit_async(self) -> None:
+        """
+        Wait until the next request is allowed under requests_per_second.
+        """
+        if not self.requests_per_second:
+            return
+        
+        async with self._rate_lock:
+            delay = max(0.0, self._next_allowed_ts - time.monotonic())
+            if delay:
+                await asyncio.sleep(delay)
+            self._next_allowed_ts = time.monotonic() + 1.0 / self.requests_per_second
+    
+    def _post_with_retry(self, payload: bytes, max_attempts: Optional[int] = None,
+                         stream: bool = False) -> requests.Response:
+        """
+        POST a request body to the API, retrying on 429 and 5xx responses.
+        
+        Args:
+            payload: The request body.
+            max_attempts: Attempts before giving up. Default is self.max_attempts.
+            stream: Whether to return before the response body is read. Default is False.
+            
+        Returns:
+            The successful response.
+        """
+        max_attempts = max_attempts or self.max_attempts
+        
+        for attempt in range(max_attempts):
+            self._wait_for_rate_limit()
+            response = self.session.post(self.api_url, data=payload, timeout=REQUEST_TIMEOUT,
+                                         stream=stream)
+            
+            status = response.status_code
+            if (status != 429 and status < 500) or attempt == max_attempts - 1:
+                try:
+                    response.raise_for_status()
+                except requests.HTTPError:
+                    # A streamed response holds its connection until closed
+                    response.close()
+                    raise
+                return response
+            
+            delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+            # Release the connection back to the pool before waiting
+            response.close()
+            logger.warning(f"API returned {status}, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_attempts})")
+            time.sleep(delay)
+    
+    async def _post_with_retry_async(self, session: aiohttp.ClientSession, payload: bytes,
+                                     max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        """
+        POST a request body to the API over an aiohttp session, retrying on 429 and 5xx responses.
+        
+        Args:
+            session: The aiohttp session used for the request.
+            payload: The request body.
+            max_attempts: Attempts before giving up. Default is self.max_attempts.
+            
+        Returns:
+            The decoded JSON response.
+        """
+        max_attempts = max_attempts or self.max_attempts
+        
+        for attempt in range(max_attempts):
+            await self._wait_for_rate_limit_async()
+            async with session.post(self.api_url, headers=self.headers, data=payload) as response:
+                status = response.status
+                if (status != 429 and status < 500) or attempt == max_attempts - 1:
+                    response.raise_for_status()
+                    return orjson.loads(await response.read())
+                
+                delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+            
+            logger.warning(f"API returned {status}, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_attempts})")
+            await asyncio.sleep(delay)
+    
     def extract_text_from_image(self, image_path: str, prompt: str = "Extract all text from this image.") -> str:
         """
         Extract text from an image using GPT-4o Vision.
         
         Args:
-            image_path: Path to the image file.
+            image_path: Path to the image file (http(s) URLs are also accepted).
             prompt: The prompt to send to the model. Default is "Extract all text from this image."
             
         Returns:
             Extracted text from the image.
         """
         try:
-            # Encode the image
-            base64_image = self._encode_image(image_path)
-            
-            # Prepare the payload
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            self._prepare_image_payload(base64_image)
-                        ]
-                    }
-                ],
-                "max_tokens": 1000
-            }
-            
-            # Make the API request
-            logger.info(f"Sending request to OpenAI API for image: {image_path}")
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
-            response.raise_for_status()
+            prepared = self._prepare_image(image_path, prompt)
+            if prepared.cached_text is not None:
+                return prepared.cached_text
             
-            # Extract and return the text
-            result = response.json()
-            extracted_text = result["choices"][0]["message"]["content"]
-            logger.info(f"Successfully extracted text from image: {image_path}")
+            extracted_text = self._request_text(prompt, prepared.image_url, image_path)
+            if prepared.cache_key:
+                self._cache_set(prepared.cache_key, extracted_text)
             
             return extracted_text
             
@@ -117,18 +643,158 @@ class OCRExtractor:
             logger.error(f"Error extracting text from image: {e}")
             raise
     
+    def stream_text_from_image(self, image_path: str,
+                               prompt: str = "Extract all text from this image.") -> Iterator[str]:
+        """
+        Extract text from an image, yielding it in chunks as the model generates it.
+        
+        Args:
+            image_path: Path to the image file (http(s) URLs are also accepted).
+            prompt: The prompt to send to the model. Default is "Extract all text from this image."
+            
+        Yields:
+            Pieces of the extracted text, in order.
+        """
+        try:
+            prepared = self._prepare_image(image_path, prompt)
+            if prepared.cached_text is not None:
+                yield prepared.cached_text
+                return
+            
+            chunks = []
+            for chunk in self._stream_text(prompt, prepared.image_url, image_path):
+                chunks.append(chunk)
+                yield chunk
+            
+            # _stream_text raises unless the response finished, so only complete responses are cached
+            if prepared.cache_key:
+                self._cache_set(prepared.cache_key, "".join(chunks))
+            
+        except Exception as e:
+            logger.error(f"Error extracting text from image: {e}")
+            raise
+    
+    def extract_from_url(self, image_url: str, prompt: str = "Extract all text from this image.") -> str:
+        """
+        Extract text from a remotely hosted image without downloading or encoding it.
+        
+        Args:
+            image_url: http(s) URL of the image, fetched directly by the API.
+            prompt: The prompt to send to the model. Default is "Extract all text from this image."
+            
+        Returns:
+            Extracted text from the image.
+        """
+        try:
+            return self._request_text(prompt, image_url, image_url)
+        except Exception as e:
+            logger.error(f"Error extracting text from image URL: {e}")
+            raise
+    
+    def _request_text(self, prompt: str, image_url: Union[str, bytes], image_label: str) -> str:
+        """
+        Send a single image to the API and return the extracted text.
+        
+        Args:
+            prompt: The prompt to send to the model.
+            image_url: Remote or base64 data URL of the image.
+            image_label: Path or URL of the image, used for logging.
+            
+        Returns:
+            Extracted text from the image.
+        """
+        # Prepare the payload
+        payload = self._build_payload(prompt, image_url)
+        
+        # Make the API request
+        logger.info(f"Sending request to OpenAI API for image: {image_label}")
+        response = self._post_with_retry(payload)
+        
+        # Extract and return the text
+        result = orjson.loads(response.content)
+        choice = result["choices"][0]
+        self._check_finish_reason(choice.get("finish_reason"), image_label)
+        extracted_text = choice["message"]["content"]
+        logger.info(f"Successfully extracted text from image: {image_label}")
+        
+        return extracted_text
+    
+    def _check_finish_reason(self, finish_reason: Optional[str], image_label: str) -> None:
+        """
+        Warn when the model stopped because it ran out of tokens rather than finishing.
+        
+        Args:
+            finish_reason: The finish_reason reported by the API.
+            image_label: Path or URL of the image, used for logging.
+        """
+        if finish_reason == "length":
+            logger.warning(f"Output for image {image_label} was truncated at max_tokens={self.max_tokens}")
+    
+    def _stream_text(self, prompt: str, image_url: Union[str, bytes], image_label: str) -> Iterator[str]:
+        """
+        Send a single image to the API with streaming enabled and yield text deltas as they arrive.
+        
+        Args:
+            prompt: The prompt to send to the model.
+            image_url: Remote or base64 data URL of the image.
+            image_label: Path or URL of the image, used for logging.
+            
+        Yields:
+            Pieces of the extracted text, in order.
+        """
+        payload = self._build_payload(prompt, image_url, stream=True)
+        
+        logger.info(f"Streaming request to OpenAI API for image: {image_label}")
+        with self._post_with_retry(payload, stream=True) as response:
+            complete = False
+            for line in response.iter_lines():
+                # Skip the blank separators and any comment/keep-alive lines between events
+                if not line.startswith(b"data: "):
+                    continue
+                
+                data = line[len(b"data: "):]
+                if data == b"[DONE]":
+                    complete = True
+                    break
+                
+                event = orjson.loads(data)
+                error = event.get("error")
+                if error:
+                    message = error.get("message", error) if isinstance(error, dict) else error
+                    raise RuntimeError(f"API returned an error while streaming: {message}")
+                if not event.get("choices"):
+                    continue
+                
+                choice = event["choices"][0]
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    yield content
+                
+                # The final event carries finish_reason; stop without waiting for [DONE]
+                finish_reason = choice.get("finish_reason")
+                if finish_reason:
+                    self._check_finish_reason(finish_reason, image_label)
+                    complete = True
+                    break
+        
+        # A connection closed mid-generation ends iter_lines cleanly; don't pass the partial text off as final
+        if not complete:
+            raise RuntimeError(f"Stream for image {image_label} ended before the response was complete")
+        
+        logger.info(f"Successfully extracted text from image: {image_label}")
+    
     def extract_structured_data(self, image_path: str, data_format: str = "table") -> Dict[str, Any]:
         """
         Extract structured data from an image.
         
         Args:
-            image_path: Path to the image file.
+            image_path: Path to the image file or http(s) URL.
             data_format: The format of data to extract (table, form, etc.). Default is "table".
             
         Returns:
             Dictionary containing the structured data.
         """
-        prompt = f"Extract the {data_format} data from this image and format it as JSON."
+        prompt = STRUCTURED_PROMPT.format(data_format=data_format)
         
         try:
             text_result = self.extract_text_from_image(image_path, prompt)
@@ -139,30 +805,196 @@ class OCRExtractor:
             logger.error(f"Error extracting structured data from image: {e}")
             raise
     
-    def batch_process(self, image_paths: List[str], prompt: Optional[str] = None) -> Dict[str, str]:
+    async def _request_text_async(self, session: aiohttp.ClientSession, prompt: str,
+                                  image_url: Union[str, bytes], image_label: str) -> str:
         """
-        Process multiple images in batch.
+        Send a single image to the API over a shared aiohttp session and return the extracted text.
+        
+        Args:
+            session: The aiohttp session used for the request.
+            prompt: The prompt to send to the model.
+            image_url: Remote or base64 data URL of the image.
+            image_label: Path or URL of the image, used for logging.
+            
+        Returns:
+            Extracted text from the image.
+        """
+        payload = self._build_payload(prompt, image_url)
+        
+        logger.info(f"Sending request to OpenAI API for image: {image_label}")
+        result = await self._post_with_retry_async(session, payload)
+        
+        choice = result["choices"][0]
+        self._check_finish_reason(choice.get("finish_reason"), image_label)
+        extracted_text = choice["message"]["content"]
+        logger.info(f"Successfully extracted text from image: {image_label}")
+        
+        return extracted_text
+    
+    async def iter_batch_async(self, image_paths: List[str], prompt: Optional[str] = None,
+                               concurrency: int = 8) -> AsyncIterator[Tuple[str, Union[str, Exception]]]:
+        """
+        Process multiple images concurrently, yielding results as they complete.
+        
+        Images are preprocessed on a thread pool and handed to `concurrency` request
+        workers through a bounded queue, so CPU work overlaps with network waits without
+        preparing far more payloads than can be sent. Images whose preprocessed content is
+        identical are encoded, uploaded and sent once and the result is shared by all of them.
+        
+        Args:
+            image_paths: List of paths to image files or http(s) URLs.
+            prompt: Optional custom prompt to use for all images.
+            concurrency: Maximum number of requests in flight at once. Default is 8.
+            
+        Yields:
+            Tuples of (image path, extracted text), or (image path, exception) if the image failed.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1.")
+        
+        prompt = prompt or "Extract all text from this image."
+        self._rate_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        pending_paths = iter(image_paths)
+        prepared_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        # Paths waiting on an in-flight request for identical content, and finished results,
+        # both keyed by cache key (or URL). The event loop is single-threaded, so checking and
+        # updating these needs no locking as long as there's no await in between.
+        waiting: Dict[str, List[str]] = {}
+        finished: Dict[str, Union[str, Exception]] = {}
+        connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1])
+        
+        async def fail(image_path: str, e: Exception) -> None:
+            logger.error(f"Error processing image {image_path}: {e}")
+            await results.put((image_path, e))
+        
+        async def publish(image_path: str, dedup_key: str, result: Union[str, Exception]) -> None:
+            # Fan the result out to every duplicate that arrived while it was being produced
+            finished[dedup_key] = result
+            for path in [image_path] + waiting.pop(dedup_key):
+                await results.put((path, result))
+        
+        async def prepare_worker() -> None:
+            # Workers share one iterator, so each path is prepared exactly once
+            for image_path in pending_paths:
+                # Decode, resize, hash and check the cache; encoding or uploading waits until
+                # the image is known not to duplicate one already in the batch
+                loaded: Optional[_LoadedImage] = None
+                try:
+                    if self._process_pool and not is_url(image_path):
+                        # Preprocess in a worker process; only the cache lookup happens here
+                        preprocessed = await loop.run_in_executor(self._process_pool, _preprocess_image, image_path,
+                                                                  self.max_side, prompt, self.model, self.max_tokens)
+                        loaded = await loop.run_in_executor(self._prep_pool, self._check_loaded_image,
+                                                            image_path, *preprocessed)
+                    elif not is_url(image_path):
+                        loaded = await loop.run_in_executor(self._prep_pool, self._load_image_checked,
+                                                            image_path, prompt)
+                except Exception as e:
+                    await fail(image_path, e)
+                    continue
+                
+                if loaded and loaded.cached_text is not None:
+                    await results.put((image_path, loaded.cached_text))
+                    continue
+                
+                dedup_key = loaded.cache_key if loaded else image_path
+                if dedup_key in finished:
+                    logger.info(f"Reusing result of an identical image for: {image_path}")
+                    await results.put((image_path, finished[dedup_key]))
+                    continue
+                if dedup_key in waiting:
+                    logger.info(f"Reusing result of an identical image for: {image_path}")
+                    waiting[dedup_key].append(image_path)
+                    continue
+                
+                # First image with this content: claim it before awaiting the encode/upload,
+                # so duplicates arriving meanwhile wait on it instead of being encoded too
+                waiting[dedup_key] = []
+                try:
+                    if loaded:
+                        prepared = await loop.run_in_executor(self._prep_pool, self._prepare_loaded_image, loaded)
+                    else:
+                        prepared = _PreparedImage(None, None, image_path)
+                except Exception as e:
+                    logger.error(f"Error processing image {image_path}: {e}")
+                    await publish(image_path, dedup_key, e)
+                    continue
+                await prepared_queue.put((image_path, dedup_key, prepared))
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def request_worker() -> None:
+                while True:
+                    image_path, dedup_key, prepared = await prepared_queue.get()
+                    try:
+                        result = await self._request_text_async(session, prompt, prepared.image_url, image_path)
+                        if prepared.cache_key:
+                            await loop.run_in_executor(self._prep_pool, self._cache_set, prepared.cache_key, result)
+                    except Exception as e:
+                        logger.error(f"Error processing image {image_path}: {e}")
+                        result = e
+                    
+                    await publish(image_path, dedup_key, result)
+            
+            workers = [asyncio.ensure_future(prepare_worker()) for _ in range(self._prep_workers)]
+            workers += [asyncio.ensure_future(request_worker()) for _ in range(concurrency)]
+            try:
+                # Every path produces exactly one result, successful or not
+                for _ in range(len(image_paths)):
+                    yield await results.get()
+            finally:
+                # Don't leave requests running if the caller stops iterating early
+                for worker in workers:
+                    worker.cancel()
+    
+    async def batch_process_async(self, image_paths: List[str], prompt: Optional[str] = None,
+                                  concurrency: int = 8) -> Dict[str, str]:
+        """
+        Process multiple images concurrently.
         
         Args:
             image_paths: List of paths to image files.
             prompt: Optional custom prompt to use for all images.
+            concurrency: Maximum number of requests in flight at once. Default is 8.
             
         Returns:
             Dictionary mapping image paths to extracted text.
         """
         results = {}
-        for image_path in image_paths:
-            try:
-                if prompt:
-                    results[image_path] = self.extract_text_from_image(image_path, prompt)
-                else:
-                    results[image_path] = self.extract_text_from_image(image_path)
-            except Exception as e:
-                logger.error(f"Error processing image {image_path}: {e}")
-                results[image_path] = f"Error: {str(e)}"
+        async for image_path, result in self.iter_batch_async(image_paths, prompt, concurrency):
+            results[image_path] = f"Error: {str(result)}" if isinstance(result, Exception) else result
         
-        return results
-
+        # Preserve the input order rather than completion order
+        return {image_path: results[image_path] for image_path in image_paths}
+    
+    def batch_process(self, image_paths: List[str], prompt: Optional[str] = None,
+                      concurrency: int = 8) -> Dict[str, str]:
+        """
+        Process multiple images in batch.
+        
+        Args:
+            image_paths: List of paths to image files.
+            prompt: Optional custom prompt to use for all images.
+            concurrency: Maximum number of requests in flight at once. Default is 8.
+            
+        Returns:
+            Dictionary mapping image paths to extracted text.
+        
+        When called from a thread that is already running an event loop (e.g. a Jupyter
+        notebook), the batch runs on its own loop in a worker thread and this call blocks
+        until it finishes; async callers should await batch_process_async instead.
+        """
+        coro = self.batch_process_async(image_paths, prompt, concurrency)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        
+        # asyncio.run refuses to nest inside a running loop
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
 
 if __name__ == "__main__":
     # Example usage